@@ -1,4 +1,6 @@
+import heapq
 import sys
+from collections import deque
 
 from crossword import *
 
@@ -10,19 +12,82 @@ class CrosswordCreator():
         Create new CSP crossword generate.
         """
         self.crossword = crossword
+
+        # Neighbors of every variable, and the overlaps of neighboring variables
+        self.neighbors = {
+            var: frozenset(self.crossword.neighbors(var))
+            for var in self.crossword.variables
+        }
+        self.overlaps = {
+            (var, neighbor): self.crossword.overlaps[var, neighbor]
+            for var in self.neighbors
+            for neighbor in self.neighbors[var]
+        }
+
+        # Give every word a dense index, so a domain can be stored as a bitmask
+        self.id_word = sorted(self.crossword.words)
+        self.word_id = {word: i for i, word in enumerate(self.id_word)}
+
+        # Bitmasks of all words per word length, bucketed in one pass over the words
+        self.length_mask = {var.length: 0 for var in self.crossword.variables}
+        # Bitmasks of words with a given letter at a given position, per word length:
+        # support_mask[length][position][letter]
+        self.support_mask = {
+            length: [dict() for _ in range(length)]
+            for length in self.length_mask
+        }
+        for word, i in self.word_id.items():
+            if len(word) not in self.length_mask:
+                continue
+            bit = 1 << i
+            self.length_mask[len(word)] |= bit
+            for position, letter in enumerate(word):
+                letters = self.support_mask[len(word)][position]
+                letters[letter] = letters.get(letter, 0) | bit
+
+        # Every domain starts out as the words of the variable length
         self.domains = {
-            var: self.crossword.words.copy()
+            var: self.length_mask[var.length]
+            for var in self.crossword.variables
+        }
+
+        # Degree of every variable, and a lazy heap of variables ordered by
+        # (domain size, -degree); entries go stale when a domain changes
+        self.degree = {
+            var: len(self.neighbors[var])
             for var in self.crossword.variables
         }
+        self.order = {var: i for i, var in enumerate(self.crossword.variables)}
+        self.heap = []
+        for var in self.domains:
+            self.push_variable(var)
+
+    def push_variable(self, var):
+        """
+        Add `var` to the variable heap with its current domain size.
+        """
+        heapq.heappush(self.heap, (
+            self.domains[var].bit_count(), -self.degree[var],
+            self.order[var], var
+        ))
+
+    def domain_words(self, domain):
+        """
+        Return list of the words in bitmask `domain`.
+        """
+        words = []
+        while domain:
+            # Take the lowest set bit off the mask
+            bit = domain & -domain
+            words.append(self.id_word[bit.bit_length() - 1])
+            domain ^= bit
+        return words
 
     def letter_grid(self, assignment):
         """
         Return 2D array representing a given assignment.
         """
-        letters = [
-            [None for _ in range(self.crossword.width)]
-            for _ in range(self.crossword.height)
-        ]
+        letters = [[None] * self.crossword.width for _ in range(self.crossword.height)]
         for variable, word in assignment.items():
             direction = variable.direction
             for k in range(len(word)):
@@ -31,28 +96,34 @@ class CrosswordCreator():
                 letters[i][j] = word[k]
         return letters
 
-    def print(self, assignment):
+    def print(self, assignment, letters=None):
         """
         Print crossword assignment to the terminal.
+        `letters` is the letter grid of `assignment`; it is computed if None.
         """
-        letters = self.letter_grid(assignment)
+        if letters is None:
+            letters = self.letter_grid(assignment)
+        structure = self.crossword.structure
         for i in range(self.crossword.height):
             for j in range(self.crossword.width):
-                if self.crossword.structure[i][j]:
+                if structure[i][j]:
                     print(letters[i][j] or " ", end="")
                 else:
                     print("█", end="")
             print()
 
-    def save(self, assignment, filename):
+    def save(self, assignment, filename, letters=None):
         """
         Save crossword assignment to an image file.
+        `letters` is the letter grid of `assignment`; it is computed if None.
         """
         from PIL import Image, ImageDraw, ImageFont
         cell_size = 100
         cell_border = 2
         interior_size = cell_size - 2 * cell_border
-        letters = self.letter_grid(assignment)
+        if letters is None:
+            letters = self.letter_grid(assignment)
+        structure = self.crossword.structure
 
         # Create a blank canvas
         img = Image.new(
@@ -64,6 +135,10 @@ class CrosswordCreator():
         font = ImageFont.truetype("assets/fonts/OpenSans-Regular.ttf", 80)
         draw = ImageDraw.Draw(img)
 
+        # Measure every distinct letter once
+        distinct = {letter for row in letters for letter in row if letter}
+        sizes = {letter: draw.textsize(letter, font=font) for letter in distinct}
+
         for i in range(self.crossword.height):
             for j in range(self.crossword.width):
 
@@ -73,10 +148,10 @@ class CrosswordCreator():
                     ((j + 1) * cell_size - cell_border,
                      (i + 1) * cell_size - cell_border)
                 ]
-                if self.crossword.structure[i][j]:
+                if structure[i][j]:
                     draw.rectangle(rect, fill="white")
                     if letters[i][j]:
-                        w, h = draw.textsize(letters[i][j], font=font)
+                        w, h = sizes[letters[i][j]]
                         draw.text(
                             (rect[0][0] + ((interior_size - w) / 2),
                              rect[0][1] + ((interior_size - h) / 2) - 10),
@@ -99,18 +174,13 @@ class CrosswordCreator():
         (Remove any values that are inconsistent with a variable's unary
          constraints; in this case, the length of the word.)
         """
-        # Loop over every variable
+        # Domains start out with the words of the variable length only, so
+        # this only removes words that were added to a domain since
         for var in self.domains:
-            # List to store words to remove from variable domain
-            removelist = []
-            # Check for every word if its length matches the variable length
-            for word in self.domains[var]:
-                # Add word to removal list if it doesn't match the variable length
-                if var.length != len(word):
-                    removelist.append(word)
-            # Remove the words from the removal list
-            for word in removelist:
-                self.domains[var].remove(word)
+            domain = self.domains[var] & self.length_mask[var.length]
+            if domain != self.domains[var]:
+                self.domains[var] = domain
+                self.push_variable(var)
 
 
     def revise(self, x, y):
@@ -122,33 +192,30 @@ class CrosswordCreator():
         Return True if a revision was made to the domain of `x`; return
         False if no revision was made.
         """
-        # Set revision as false
-        revision = False
-        
         # Find overlap between variable x and y
-        overlap = self.crossword.overlaps.get((x,y))
-        
-        # Ensure arc consistency if there is overlap between x an y
-        if overlap:
-            # List to store words to remove from x-domain
-            removelist = []
-            for xword in self.domains[x]:
-                # Set arc consistency from xword to False
-                ac = False
-                for yword in self.domains[y]:
-                    # Check if overlap is possible between word from x-domain and y
-                    if xword[overlap[0]] == yword[overlap[1]]:
-                        ac = True
-                        break
-                # If xword is not arc consistent with y, add to removelist and set revision to true
-                if ac == False:
-                    removelist.append(xword)
-                    revision = True
-            # Remove words froms x-domain
-            for word in removelist:
-                self.domains[x].remove(word)
+        overlap = self.overlaps.get((x, y))
+
+        # No revision is needed if there is no overlap between x and y
+        if not overlap:
+            return False
+        ox, oy = overlap
+
+        # Keep the words from the x-domain with a letter on the overlap that
+        # some word left in the y-domain also has there
+        xsupport = self.support_mask[x.length][ox]
+        ydomain = self.domains[y]
+        keep = 0
+        for letter, ywords in self.support_mask[y.length][oy].items():
+            if ywords & ydomain:
+                keep |= xsupport.get(letter, 0)
+        revised = self.domains[x] & keep
+
         # Return whether there has been made a revision to the domain of "x"
-        return revision
+        if revised == self.domains[x]:
+            return False
+        self.domains[x] = revised
+        self.push_variable(x)
+        return True
 
     def ac3(self, arcs=None):
         """
@@ -159,29 +226,35 @@ class CrosswordCreator():
         Return True if arc consistency is enforced and no domains are empty;
         return False if one or more domains end up empty.
         """
-        # Initial list of all arcs in the problem if arcs is empty
-        if not arcs:
+        # Initial list of all arcs in the problem if no arcs are given
+        if arcs is None:
             arcs = []
             # Loop over every variable and its neighbors
             for var in self.domains:
-                for neighbor in self.crossword.neighbors(var):
+                for neighbor in self.neighbors[var]:
                     # Add arc to list
                     if var != neighbor:
                         arcs.append((var, neighbor))
-        
+
+        # Queue of arcs, and the set of arcs currently in the queue
+        queue = deque(arcs)
+        queued = set(queue)
+
         # Loop while there are arcs
-        while arcs:
-            x, y = arcs.pop()
+        while queue:
+            x, y = queue.popleft()
+            queued.discard((x, y))
             # Check if a revision has been made
             if self.revise(x, y):
                 # Return False if there are no values in x-domain left
                 if not self.domains[x]:
                     return False
-                # Add all arcs between x and z(!= y) to the queue
-                for z in self.crossword.neighbors(x):
-                    if z != y:
-                       arcs.append((z,x))     
-        
+                # Add all arcs between x and z(!= y) to the queue, if not queued already
+                for z in self.neighbors[x]:
+                    if z != y and (z, x) not in queued:
+                        queue.append((z, x))
+                        queued.add((z, x))
+
         # Return True if arc consistency is enforced and no domains are empty
         return True
 
@@ -206,26 +279,47 @@ class CrosswordCreator():
         Return True if `assignment` is consistent (i.e., words fit in crossword
         puzzle without conflicting characters); return False otherwise.
         """
-        # A list to save all the words in
-        words = []
+        # A set to save all the words in
+        words = set()
         # Loop over every variable in assignment
-        for var in assignment:            
+        for var in assignment:
             word = assignment[var]
             # Inconsistent if variable length is not the correct length or words are not distinct
             if var.length != len(word) or word in words:
                 return False
-            # Add word to words list
-            words.append(word)
+            # Add word to words set
+            words.add(word)
             # Check if there are no conflicts between neighboring variables.
-            for neighbor in self.crossword.neighbors(var):
+            for neighbor in self.neighbors[var]:
                 if neighbor in assignment:
-                    i, j = self.crossword.overlaps[var, neighbor]
+                    i, j = self.overlaps[var, neighbor]
                     if word[i] != assignment[neighbor][j]:
                         return False
-        
+
         # Return True is assignment is consistent
         return True
 
+    def _consistent_for(self, var, assignment, used_words):
+        """
+        Return True if the value of `var` in `assignment` is consistent with
+        the rest of the (already consistent) `assignment`; return False
+        otherwise. `used_words` is the set of words assigned to the other
+        variables.
+        """
+        word = assignment[var]
+        # Inconsistent if variable length is not the correct length or word is already used
+        if var.length != len(word) or word in used_words:
+            return False
+        # Only the neighbors of the new variable can conflict with it
+        for neighbor in self.neighbors[var]:
+            if neighbor in assignment:
+                i, j = self.overlaps[var, neighbor]
+                if word[i] != assignment[neighbor][j]:
+                    return False
+
+        # Return True if the new value fits the assignment
+        return True
+
     def order_domain_values(self, var, assignment):
         """
         Return a list of values in the domain of `var`, in order by
@@ -233,32 +327,27 @@ class CrosswordCreator():
         The first value in the list, for example, should be the one
         that rules out the fewest values among the neighbors of `var`.
         """
-        # Initialise list to save variable and number of restictions associated with it
-        reslist = []
-        # Loop over every value in the domain of "var"
-        for value in self.domains[var]:
-            # Check if value is already assigned
-            if value not in assignment:
-                # Initialise variable to count the number of restictions associated with value
-                counter = 0
-                # Loop over every neighbor
-                for neighbor in self.crossword.neighbors(var):
-                    # Add 1 to counter if variable rules out neighbour
-                    if value in self.domains[neighbor]:
-                        counter += 1
-            # Append value and restriction counter to reslist
-            reslist.append((value, counter))
-        
-        # Sort based on fewest number of restrictions
-        sortedlist = sorted(reslist, key=lambda item: item[1])
-        
-        # Make a list of only the values without the number of retrictions
-        vlist = []
-        for v in sortedlist:
-            vlist.append(v[0])
-        
-        # Return a sorted list of all values
-        return vlist
+        # Unassigned neighbors with their overlap, domain and domain size
+        neighbors = []
+        for neighbor in self.neighbors[var]:
+            if neighbor not in assignment:
+                domain = self.domains[neighbor]
+                neighbors.append(
+                    (neighbor, self.overlaps[var, neighbor],
+                     domain, domain.bit_count())
+                )
+
+        def ruled_out(value):
+            """Count the values of the neighbors that `value` rules out."""
+            count = 0
+            for neighbor, (i, j), domain, size in neighbors:
+                # Neighbor words with the same letter on the overlap remain possible
+                support = self.support_mask[neighbor.length][j].get(value[i], 0)
+                count += size - (domain & support).bit_count()
+            return count
+
+        # Return all values, sorted based on fewest number of ruled out values
+        return sorted(self.domain_words(self.domains[var]), key=ruled_out)
 
     def select_unassigned_variable(self, assignment):
         """
@@ -268,52 +357,36 @@ class CrosswordCreator():
         degree. If there is a tie, any of the tied variables are acceptable
         return values.
         """
-        # Initialise a list to store variable with the least values in its domain
-        minvalues = [[99999, 99999]]
-        # Loop over every variable
+        # Drop heap entries of assigned variables and of changed domains
+        while self.heap:
+            count, _, _, var = self.heap[0]
+            if var in assignment or count != self.domains[var].bit_count():
+                heapq.heappop(self.heap)
+            else:
+                # Return variable with fewest values, then highest degree
+                return var
+
+        # Rebuild heap if it ran out, and select from the rebuilt heap
         for var in self.domains:
-            # Continue if variable is already assigned
-            if var in assignment:
-                continue
-            # Count the number of values in variable domain
-            count = 0
-            for value in self.domains[var]:
-                count += 1
-            # Save variable and number of values in domain in minvalues list if it's the current minimum
-            if count < minvalues[0][1]:
-                minvalues = [[var, count]]
-            # If it's a tied minimum, add variable and number of values to minvalues list
-            elif count == minvalues[0][1]:
-                minvalues.append([var, count])
-        
-        # Find value with highest degree out of minvalues list if there is more than one variable left
-        if len(minvalues) > 1:
-            minvalues[0][1] = 0
-            # Loop over every variable left
-            for minvalue in minvalues:
-                var = minvalue[0]
-                # Initialise variable n to count number of neighbours
-                n = 0
-                # Count neighbours
-                for neighbor in self.crossword.neighbors(var):
-                    n += 1
-                # Save variable and neighbourcount if n is current maximum
-                if n > minvalues[0][1]:
-                    minvalues[0] = [var, n]
-        
-        # Return variable
-        return minvalues[0][0]
+            if var not in assignment:
+                self.push_variable(var)
+        return self.heap[0][3] if self.heap else None
 
 
-    def backtrack(self, assignment):
+    def backtrack(self, assignment, used_words=None):
         """
         Using Backtracking Search, take as input a partial assignment for the
         crossword and return a complete assignment if possible to do so.
 
         `assignment` is a mapping from variables (keys) to words (values).
+        `used_words` is the set of words in `assignment`; it is built from
+        `assignment` if not given.
 
         If no assignment is possible, return None.
         """
+        # Collect the words that are already assigned
+        if used_words is None:
+            used_words = set(assignment.values())
         # Return assignment if complete
         if self.assignment_complete(assignment):
             return assignment
@@ -323,18 +396,40 @@ class CrosswordCreator():
         for value in self.order_domain_values(var, assignment):
             # Add var and value to assignment
             assignment.update({var: value})
-            # Check if assignment is consistent
-            if self.consistent(assignment):
-                # Use recursion
-                result = self.backtrack(assignment)
-                if result:
-                    return result
+            # Check if the new value is consistent with the assignment so far
+            if self._consistent_for(var, assignment, used_words):
+                # Save the domains that inference is allowed to change
+                saved = {
+                    v: self.domains[v]
+                    for v in self.domains
+                    if v not in assignment or v == var
+                }
+                # Maintain arc consistency with the new value (forward checking)
+                self.domains[var] = 1 << self.word_id[value]
+                arcs = [
+                    (neighbor, var)
+                    for neighbor in self.neighbors[var]
+                    if neighbor not in assignment
+                ]
+                if self.ac3(arcs=arcs):
+                    # Use recursion
+                    used_words.add(value)
+                    result = self.backtrack(assignment, used_words)
+                    if result:
+                        return result
+                    used_words.remove(value)
+                # Restore the domains from before the inference
+                for v, domain in saved.items():
+                    if self.domains[v] != domain:
+                        self.domains[v] = domain
+                        self.push_variable(v)
             # Remove var and value from assignment
             assignment.pop(var)
-        
+            self.push_variable(var)
+
         # Return None if no solution
         return None
-            
+
 
 def main():
 
@@ -356,9 +451,10 @@ def main():
     if assignment is None:
         print("No solution.")
     else:
-        creator.print(assignment)
+        letters = creator.letter_grid(assignment)
+        creator.print(assignment, letters)
         if output:
-            creator.save(assignment, output)
+            creator.save(assignment, output, letters)
 
 
 if __name__ == "__main__":
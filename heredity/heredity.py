@@ -1,5 +1,6 @@
 import csv
 import itertools
+import numpy as np
 import sys
 
 PROBS = {
@@ -36,6 +37,23 @@ PROBS = {
     "mutation": 0.01
 }
 
+# Probability for a parent with 0, 1 or 2 copies of the gene to pass it on
+PASS = (PROBS["mutation"], 0.5, 1 - PROBS["mutation"])
+
+# Probability of having the trait, and of not having it, given 0, 1 or 2 copies
+TRAIT_T = tuple(PROBS["trait"][gene][True] for gene in range(3))
+TRAIT_F = tuple(PROBS["trait"][gene][False] for gene in range(3))
+
+# Probability for a child to have k copies of the gene, given the number of
+# copies of the mother and of the father: CHILD[mother][father][k]
+CHILD = [
+    [
+        ((1 - pf) * (1 - pm), pf * (1 - pm) + pm * (1 - pf), pf * pm)
+        for pf in PASS
+    ]
+    for pm in PASS
+]
+
 
 def main():
 
@@ -44,46 +62,40 @@ def main():
         sys.exit("Usage: python heredity.py data.csv")
     people = load_data(sys.argv[1])
 
+    # Compute each person's gene distribution given the evidence, as rows
+    # of probabilities for 0, 1 and 2 copies of the gene
+    names = list(people)
+    factors = gene_factors(people)
+    gene_totals = np.array([marginal(factors, person) for person in names])
+
+    # Trait is known from the evidence, or follows from the gene distribution,
+    # as rows of probabilities for True and False
+    trait_totals = gene_totals @ np.array([TRAIT_T, TRAIT_F]).T
+    for i, person in enumerate(names):
+        observed = people[person]["trait"]
+        if observed is not None:
+            trait_totals[i] = (observed, not observed)
+
+    # Ensure probabilities sum to 1
+    gene_totals /= gene_totals.sum(axis=1, keepdims=True)
+    trait_totals /= trait_totals.sum(axis=1, keepdims=True)
+
     # Keep track of gene and trait probabilities for each person
     probabilities = {
         person: {
             "gene": {
-                2: 0,
-                1: 0,
-                0: 0
+                2: gene_totals[i, 2],
+                1: gene_totals[i, 1],
+                0: gene_totals[i, 0]
             },
             "trait": {
-                True: 0,
-                False: 0
+                True: trait_totals[i, 0],
+                False: trait_totals[i, 1]
             }
         }
-        for person in people
+        for i, person in enumerate(names)
     }
 
-    # Loop over all sets of people who might have the trait
-    names = set(people)
-    for have_trait in powerset(names):
-
-        # Check if current set of people violates known information
-        fails_evidence = any(
-            (people[person]["trait"] is not None and
-             people[person]["trait"] != (person in have_trait))
-            for person in names
-        )
-        if fails_evidence:
-            continue
-
-        # Loop over all sets of people who might have the gene
-        for one_gene in powerset(names):
-            for two_genes in powerset(names - one_gene):
-
-                # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
-
-    # Ensure probabilities sum to 1
-    normalize(probabilities)
-
     # Print results
     for person in people:
         print(f"{person}:")
@@ -118,14 +130,85 @@ def load_data(filename):
 
 def powerset(s):
     """
-    Return a list of all possible subsets of set s.
+    Return an iterator over all possible subsets of set s, as frozensets.
     """
-    s = list(s)
-    return [
-        set(s) for s in itertools.chain.from_iterable(
-            itertools.combinations(s, r) for r in range(len(s) + 1)
-        )
-    ]
+    s = tuple(s)
+    return (
+        frozenset(subset)
+        for r in range(len(s) + 1)
+        for subset in itertools.combinations(s, r)
+    )
+
+
+def gene_factors(people):
+    """
+    Return the factors of the joint distribution of everyone's gene count,
+    with the known traits of `people` taken into account as evidence.
+
+    A factor is a tuple `(scope, table)`, where `scope` is a tuple of names
+    and `table` is an array with an axis of length 3 for each of those names,
+    indexed by their number of copies of the gene.
+    """
+    factors = []
+    for person in people:
+        mother = people[person]["mother"]
+        father = people[person]["father"]
+        trait = people[person]["trait"]
+
+        # Probability of the gene count given the parents, or unconditional
+        if mother and father:
+            scope = (person, mother, father)
+            table = np.moveaxis(np.array(CHILD), 2, 0)
+        else:
+            scope = (person,)
+            table = np.array([PROBS["gene"][gene] for gene in range(3)])
+
+        # Weigh each gene count with the likelihood of the known trait
+        if trait is not None:
+            likelihood = np.array(TRAIT_T if trait else TRAIT_F)
+            table = table * likelihood.reshape((3,) + (1,) * (len(scope) - 1))
+
+        factors.append((scope, table))
+    return factors
+
+
+def contract(factors, scope):
+    """
+    Multiply a list of factors, sum out every name that is not in `scope`,
+    and return the resulting factor over `scope`.
+    """
+    # Number every name in the factors, to label the axes for np.einsum
+    index = dict()
+    operands = []
+    for names, table in factors:
+        for name in names:
+            index.setdefault(name, len(index))
+        operands.extend((table, [index[name] for name in names]))
+    return tuple(scope), np.einsum(*operands, [index[name] for name in scope])
+
+
+def marginal(factors, person):
+    """
+    Return the unnormalized distribution of the gene count of `person`, by
+    eliminating everyone else from the product of `factors`, as an array
+    indexed by the number of copies of the gene.
+    """
+    factors = list(factors)
+    names = {name for scope, _ in factors for name in scope} - {person}
+    while names:
+        # Eliminate the name that leaves the smallest factor behind
+        name = min(names, key=lambda name: len(set().union(
+            *(scope for scope, _ in factors if name in scope)
+        )))
+        related = [factor for factor in factors if name in factor[0]]
+        factors = [factor for factor in factors if name not in factor[0]]
+        scope = set().union(*(scope for scope, _ in related)) - {name}
+        factors.append(contract(related, scope))
+        names.remove(name)
+
+    # Only factors over `person` (or no one) are left
+    _, table = contract(factors, (person,))
+    return table
 
 
 def joint_probability(people, one_gene, two_genes, have_trait):
@@ -139,66 +222,36 @@ def joint_probability(people, one_gene, two_genes, have_trait):
         * everyone in set `have_trait` has the trait, and
         * everyone not in set` have_trait` does not have the trait.
     """
+    # Number of copies of the gene for every person
+    gene_count = {
+        person: (1 if person in one_gene else
+                 2 if person in two_genes else 0)
+        for person in people
+    }
+
     # Initialise joint probability
     p = 1
     # Loop over every person
     for person in people:
+        gene = gene_count[person]
+        mother = people[person]["mother"]
+        father = people[person]["father"]
+
         # Calculate conditional probability for genes, if the parents are in people dictionary
-        if people[person]["mother"] and people[person]["father"]:
-            mother = people[person]["mother"]
-            father = people[person]["father"]
-            
-            # Calculate possibility pm for mother to pass on a gene
-            if mother in one_gene:
-                pm = 0.5
-            elif mother in two_genes:
-                pm = 0.99
-            else:
-                pm = 0.01
-            
-            # Calculate possibility pf for father to pass on a gene
-            if father in one_gene:
-                pf = 0.5
-            elif father in two_genes:
-                pf = 0.99
-            else:
-                pf = 0.01
-            
-            # Calculate probability for person to have one copy of the gene
-            if person in one_gene:
-                p = p * (pf * (1 - pm) + pm * (1 - pf))
-                gene = 1
-            # Calculate probability for person to have two copies of the gene
-            elif person in two_genes:
-                p = p * (pf * pm)
-                gene = 2
-            # Calculate probability for person to not have the gene
-            else:
-                p = p * ((1 - pf) * (1 - pm))
-                gene = 0
-        
+        if mother and father:
+            p = p * CHILD[gene_count[mother]][gene_count[father]][gene]
+
         # Calculate unconditional probability for genes, if the parents are not in people dictionary
         else:
-            # Calculate probability for person to have one copy of the gene
-            if person in one_gene:
-                p = p * PROBS["gene"][1]
-                gene = 1
-            # Calculate probability for person to have two copies of the gene
-            elif person in two_genes:
-                p = p * PROBS["gene"][2]
-                gene = 2
-            # Calculate probability for person to not have the gene
-            else:
-                p = p * PROBS["gene"][0]
-                gene = 0
-            
-        # Calculate probability for person to have the trait based on number of genes
-        if person in have_trait:
-            p = p * PROBS["trait"][gene][True]
-        # Calculate probability for person to not have the trait based on number of genes
-        else:
-            p = p * PROBS["trait"][gene][False]
-            
+            p = p * PROBS["gene"][gene]
+
+        # Calculate probability for person to have the trait or not based on number of genes
+        p = p * (TRAIT_T if person in have_trait else TRAIT_F)[gene]
+
+        # Stop early if the joint probability has become zero
+        if p == 0:
+            return 0
+
     # Return joint probability
     return p
 
@@ -210,32 +263,31 @@ def update(probabilities, one_gene, two_genes, have_trait, p):
     Which value for each distribution is updated depends on whether
     the person is in `have_gene` and `have_trait`, respectively.
     """
+    # Adding a zero probability changes nothing
+    if p == 0:
+        return
+
     # Update probability for every person in probabilities
     for person in probabilities:
-        
+
         genes = probabilities[person]["gene"]
         # Update probability for having one copy of the gene
         if person in one_gene:
-            p_new = genes[1] + p
-            genes.update({1: p_new})
+            genes[1] += p
         # Update probability for having two copies of the gene
         elif person in two_genes:
-            p_new = genes[2] + p
-            genes.update({2: p_new})
+            genes[2] += p
         # Update probability for not having the gene
         else:
-            p_new = genes[0] + p
-            genes.update({0: p_new})
-        
+            genes[0] += p
+
         traits = probabilities[person]["trait"]
         # Update probability for having the trait
         if person in have_trait:
-            p_new = traits[True] + p
-            traits.update({True: p_new})
+            traits[True] += p
         # Update probability for not having the trait
         else:
-            p_new = traits[False] + p
-            traits.update({False: p_new})
+            traits[False] += p
 
 
 def normalize(probabilities):
@@ -248,19 +300,17 @@ def normalize(probabilities):
         genes = probabilities[person]["gene"]
         # Calculate the sum psum of all probabilities in gene
         psum = genes[0] + genes[1] + genes[2]
-        # Update with normalized probability pnorm by dividing p by psum 
+        # Update with normalized probability by dividing p by psum
         for i in genes:
-            pnorm = genes[i] / psum
-            genes.update({i: pnorm})
-        
+            genes[i] /= psum
+
         traits = probabilities[person]["trait"]
         # Calculate the sum psum of all probabilities in trait
         psum = traits[True] + traits[False]
-        # Update with normalized probability pnorm by dividing p by psum         
+        # Update with normalized probability by dividing p by psum
         for i in traits:
-            pnorm = traits[i] / psum
-            traits.update({i: pnorm})
-            
+            traits[i] /= psum
+
 
 if __name__ == "__main__":
     main()
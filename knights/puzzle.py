@@ -1,3 +1,5 @@
+import itertools
+
 from logic import *
 
 AKnight = Symbol("A is a Knight")
@@ -9,11 +11,14 @@ BKnave = Symbol("B is a Knave")
 CKnight = Symbol("C is a Knight")
 CKnave = Symbol("C is a Knave")
 
+# Every character is either a knight or a knave, and not both at the same
+# time; only models respecting that are considered, so the knowledge bases
+# below only contain what the characters say
+characters = [(AKnight, AKnave), (BKnight, BKnave), (CKnight, CKnave)]
+
 # Puzzle 0
 # A says "I am both a knight and a knave."
 knowledge0 = And(
-    Or(AKnight, AKnave),    # A is either a knight or a knave
-    Not(And(AKnight, AKnave)),  # A is not both a knight and a knave at the same time
     Biconditional(And(AKnight, AKnave), AKnight)    # A is a knight if he speaks the truth
 )
 
@@ -21,10 +26,6 @@ knowledge0 = And(
 # A says "We are both knaves."
 # B says nothing.
 knowledge1 = And(
-    Or(AKnight, AKnave),    # A is either a knight or a knave
-    Not(And(AKnight, AKnave)),  # A is not both a knight and a knave at the same time
-    Or(BKnight, BKnave),    # B is either a knight or a knave
-    Not(And(BKnight, BKnave)),  # B is not both a knight and a knave at the same time
     Biconditional(And(AKnave, BKnave), AKnight),  # A is a knight if he speaks the truth
 )
 
@@ -32,10 +33,6 @@ knowledge1 = And(
 # A says "We are the same kind."
 # B says "We are of different kinds."
 knowledge2 = And(
-    Or(AKnight, AKnave),    # A is either a knight or a knave
-    Not(And(AKnight, AKnave)),  # A is not both a knight and a knave at the same time
-    Or(BKnight, BKnave),    # B is either a knight or a knave
-    Not(And(BKnight, BKnave)),  # B is not both a knight and a knave at the same time
     Biconditional(Or(And(AKnight, BKnight), And(AKnave, BKnave)), AKnight),  # A is a knight if he speaks the truth
     Biconditional(Or(And(AKnight, BKnave), And(AKnave, BKnight)), BKnight),   # B is a knight if he speaks the truth
 )
@@ -46,12 +43,6 @@ knowledge2 = And(
 # B says "C is a knave."
 # C says "A is a knight."
 knowledge3 = And(
-    Or(AKnight, AKnave),    # A is either a knight or a knave
-    Not(And(AKnight, AKnave)),  # A is not both a knight and a knave at the same time
-    Or(BKnight, BKnave),    # B is either a knight or a knave
-    Not(And(BKnight, BKnave)),  # B is not both a knight and a knave at the same time
-    Or(CKnight, CKnave),    # C is either a knight or a knave
-    Not(And(CKnight, CKnave)),  # C is not both a knight and a knave at the same time   
     Biconditional(Or(Biconditional(AKnave, AKnight), Biconditional(Not(AKnave), AKnave)), BKnight), # B is a knight if he speaks the truth
     Biconditional(CKnave, BKnight), # B is a knight if he speaks the truth
     Biconditional(AKnight, CKnight) # C is a knight if he speaks the truth
@@ -71,8 +62,20 @@ def main():
         if len(knowledge.conjuncts) == 0:
             print("    Not yet implemented.")
         else:
+            # Enumerate every model where each character is a knight or a knave,
+            # keeping those where the knowledge base is true
+            models = []
+            for knights in itertools.product([True, False], repeat=len(characters)):
+                model = dict()
+                for (knight, knave), is_knight in zip(characters, knights):
+                    model[knight.name] = is_knight
+                    model[knave.name] = not is_knight
+                if knowledge.evaluate(model):
+                    models.append(model)
+
+            # A symbol is entailed if it is true in every model of the knowledge base
             for symbol in symbols:
-                if model_check(knowledge, symbol):
+                if all(symbol.evaluate(model) for model in models):
                     print(f"    {symbol}")
 
 
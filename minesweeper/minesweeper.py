@@ -1,5 +1,7 @@
 import itertools
+import numpy as np
 import random
+from collections import deque
 
 
 class Minesweeper():
@@ -12,23 +14,15 @@ class Minesweeper():
         # Set initial width, height, and number of mines
         self.height = height
         self.width = width
-        self.mines = set()
 
         # Initialize an empty field with no mines
-        self.board = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                row.append(False)
-            self.board.append(row)
+        self.board = np.zeros((height, width), dtype=bool)
 
-        # Add mines randomly
-        while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            if not self.board[i][j]:
-                self.mines.add((i, j))
-                self.board[i][j] = True
+        # Add mines randomly, at distinct cells of the flattened board
+        cells = np.random.choice(height * width, mines, replace=False)
+        self.board.flat[cells] = True
+        rows, columns = np.unravel_index(cells, (height, width))
+        self.mines = set(zip(rows.tolist(), columns.tolist()))
 
         # At first, player has found no mines
         self.mines_found = set()
@@ -49,8 +43,7 @@ class Minesweeper():
         print("--" * self.width + "-")
 
     def is_mine(self, cell):
-        i, j = cell
-        return self.board[i][j]
+        return bool(self.board[cell])
 
     def nearby_mines(self, cell):
         """
@@ -58,24 +51,10 @@ class Minesweeper():
         within one row and column of a given cell,
         not including the cell itself.
         """
-
-        # Keep count of nearby mines
-        count = 0
-
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
-
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
-
-        return count
+        # Count the mines in the (clipped) 3x3 square around the cell
+        i, j = cell
+        square = self.board[max(0, i - 1):i + 2, max(0, j - 1):j + 2]
+        return int(square.sum()) - int(self.board[i, j])
 
     def won(self):
         """
@@ -94,19 +73,43 @@ class Sentence():
     def __init__(self, cells, count):
         self.cells = set(cells)
         self.count = count
+        self._update_status()
 
     def __eq__(self, other):
         return self.cells == other.cells and self.count == other.count
 
+    def __hash__(self):
+        return hash(self.key())
+
+    def key(self):
+        """
+        Returns the cells and count of the sentence as a hashable tuple.
+        """
+        return frozenset(self.cells), self.count
+
     def __str__(self):
         return f"{self.cells} = {self.count}"
 
-    def known_mines(self):
+    def _update_status(self):
         """
-        Returns the set of all cells in self.cells known to be mines.
+        Records whether all cells in the sentence are known to be mines
+        ("mines"), known to be safe ("safes"), or neither (None).
+        Called whenever the cells or the count change.
         """
         # If count of mines is equal to count of cells, all cells are mines
         if len(self.cells) == self.count and self.count > 0:
+            self._status = "mines"
+        # If count is zero, then all cells are safe
+        elif self.count == 0:
+            self._status = "safes"
+        else:
+            self._status = None
+
+    def known_mines(self):
+        """
+        Returns the set of all cells in self.cells known to be mines.
+        """
+        if self._status == "mines":
             return self.cells
         else:
             return set()
@@ -115,8 +118,7 @@ class Sentence():
         """
         Returns the set of all cells in self.cells known to be safe.
         """
-        # If count is zero, then all cells are safe
-        if self.count == 0:
+        if self._status == "safes":
             return self.cells
         else:
             return set()
@@ -130,6 +132,7 @@ class Sentence():
         if cell in self.cells:
             self.cells.remove(cell)
             self.count = self.count - 1
+            self._update_status()
 
     def mark_safe(self, cell):
         """
@@ -139,6 +142,7 @@ class Sentence():
         # If cell is in the sentence, remove it (without decreasing the count)
         if cell in self.cells:
             self.cells.remove(cell)
+            self._update_status()
 
 
 class MinesweeperAI():
@@ -152,6 +156,23 @@ class MinesweeperAI():
         self.height = height
         self.width = width
 
+        # All cells on the board
+        self._all_cells = frozenset(
+            (i, j) for i in range(height) for j in range(width)
+        )
+
+        # Neighbouring cells within bounds, for every cell on the board
+        self._neighbours = {
+            (i, j): frozenset(
+                (i + di, j + dj)
+                for di in range(-1, 2)
+                for dj in range(-1, 2)
+                if (di, dj) != (0, 0)
+                and 0 <= i + di < height and 0 <= j + dj < width
+            )
+            for i, j in self._all_cells
+        }
+
         # Keep track of which cells have been clicked on
         self.moves_made = set()
 
@@ -162,14 +183,62 @@ class MinesweeperAI():
         # List of sentences about the game known to be true
         self.knowledge = []
 
+        # Sentences in the knowledge base containing each cell, and the
+        # keys of all non-empty sentences in the knowledge base
+        self._by_cell = dict()
+        self._known_sentences = set()
+
+        # Sentences that are new or changed, and still have to be checked
+        # for known mines, known safes and new inferences
+        self._dirty = deque()
+
+    def _add_sentence(self, sentence):
+        """
+        Adds a sentence to the knowledge base, unless it has no cells or
+        it is already known.
+        Returns True if the sentence was added, False otherwise.
+        """
+        key = sentence.key()
+        if not sentence.cells or key in self._known_sentences:
+            return False
+        self._known_sentences.add(key)
+        self.knowledge.append(sentence)
+        for cell in sentence.cells:
+            self._by_cell.setdefault(cell, []).append(sentence)
+        self._dirty.append(sentence)
+        return True
+
+    def _update_sentences(self, cell, mark):
+        """
+        Calls `mark(sentence, cell)` on every sentence that contains `cell`,
+        keeping the index of the knowledge base up to date.
+        """
+        for sentence in self._by_cell.pop(cell, []):
+            self._known_sentences.discard(sentence.key())
+            mark(sentence, cell)
+            if not sentence.cells:
+                continue
+            # Drop the sentence if it is already known as another sentence
+            key = sentence.key()
+            if key in self._known_sentences:
+                for other in sentence.cells:
+                    self._by_cell[other] = [
+                        s for s in self._by_cell[other] if s is not sentence
+                    ]
+                sentence.cells = set()
+                sentence.count = 0
+                sentence._update_status()
+            else:
+                self._known_sentences.add(key)
+                self._dirty.append(sentence)
+
     def mark_mine(self, cell):
         """
         Marks a cell as a mine, and updates all knowledge
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+        self._update_sentences(cell, Sentence.mark_mine)
 
     def mark_safe(self, cell):
         """
@@ -177,8 +246,7 @@ class MinesweeperAI():
         to mark that cell as safe as well.
         """
         self.safes.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_safe(cell)
+        self._update_sentences(cell, Sentence.mark_safe)
 
     def add_knowledge(self, cell, count):
         """
@@ -201,77 +269,60 @@ class MinesweeperAI():
         # Mark the cell as safe
         self.mark_safe(cell)        
         
-        # Make a set of all neighbouring cells
-        neighbours = set()
-        for i in range(-1,2):
-            for j in range(-1,2):
-                a, b = cell
-                neighbour = (a+i, b+j)
-                
-                # Ignore cell and substract 1 from count if it contains a mine
-                if neighbour in self.mines:
-                    count = count - 1
-                    continue
-                
-                # Ignore cell if it's safe
-                if neighbour in self.safes:
-                    continue
-                
-                # If cell is within bounds, add to the set
-                if 0 <= neighbour[0] < self.height and 0 <= neighbour[1] < self.width:
-                    neighbours.add(neighbour)
+        # Substract the neighbouring mines from count, and make a set of the
+        # neighbouring cells that are not known to be mines or safe
+        neighbours = self._neighbours[cell]
+        count = count - len(neighbours & self.mines)
+        neighbours = neighbours - self.mines - self.safes
         
         # Add a new sentence to knowledge base
-        self.knowledge.append(Sentence(neighbours, count))
-        
-        # Variable to check if knowledgebase is changed
-        knowledgechange = True
+        self._add_sentence(Sentence(neighbours, count))
         
-        # Add new sentence to knowledge base
-        while knowledgechange:
-            knowledgechange = False
-                
-            # Make a new set for all mines and safe spaces
-            mines = set()
-            safes = set()
-
-            # Get set of mines and safe spaces from knowledge base
-            for sentence in self.knowledge:
-                mines = mines.union(sentence.known_mines())
-                safes = safes.union(sentence.known_safes())
-            
-            # Mark any mines or safe spaces
+        # Check new and changed sentences until no more conclusions can be drawn
+        while self._dirty:
+            sentence = self._dirty.popleft()
+
+            # Skip sentences that have been emptied or dropped in the meantime
+            if not sentence.cells:
+                # Error if sentence with no cells and count > 0
+                if sentence.count > 0:
+                    raise ValueError
+                continue
+
+            # Mark any mines or safe spaces; this requeues the sentences containing them
+            mines = sentence.known_mines()
             if mines:
-                knowledgechange = True
-                for mine in mines:
+                for mine in list(mines):
                     self.mark_mine(mine)
+                continue
+            safes = sentence.known_safes()
             if safes:
-                knowledgechange = True
-                for safe in safes:
+                for safe in list(safes):
                     self.mark_safe(safe)
-            
-            # Remove any empty sentences from knowledge base:
-            empty = Sentence(set(), 0)
-            self.knowledge[:] = [x for x in self.knowledge if x != empty]
-            
+                continue
+
+            # Sentences that are a subset or a superset of this sentence share a cell with it
+            others = dict()
+            for cell in sentence.cells:
+                for other in self._by_cell[cell]:
+                    others[id(other)] = other
+
             # Add new sentences from inference
-            for sentence1 in self.knowledge:
-                for sentence2 in self.knowledge:
-                    # Error if sentence with no cells and count > 0
-                    if sentence1.cells == set() and sentence1.count > 0:  
-                        raise ValueError
-                    # New sentence can be created if one is a subset of the other
-                    if sentence1 != sentence2 and sentence1.cells.issubset(sentence2.cells):
-                        # Create new sentence by inference
-                        knowledgechange = True
-                        cells = sentence2.cells - sentence1.cells
-                        count = sentence2.count - sentence1.count
-                        newsentence = Sentence(cells, count)
-                        
-                        # Add new sentence to knowledgebase, if it doesn't already exist
-                        if newsentence not in self.knowledge:
-                            knowledgechange = True
-                            self.knowledge.append(newsentence)
+            for other in others.values():
+                # New sentence can be created if one is a subset of the other
+                if other.cells < sentence.cells:
+                    subset, superset = other, sentence
+                elif sentence.cells < other.cells:
+                    subset, superset = sentence, other
+                else:
+                    continue
+                # Create new sentence by inference, and add it if it doesn't already exist
+                cells = superset.cells - subset.cells
+                count = superset.count - subset.count
+                self._add_sentence(Sentence(cells, count))
+
+        # Remove any empty sentences from knowledge base
+        self.knowledge[:] = [x for x in self.knowledge if x.cells]
 
     def make_safe_move(self):
         """
@@ -287,7 +338,7 @@ class MinesweeperAI():
         
         # Return a random safe move if there are any
         if safe_moves:
-            return random.sample(safe_moves, 1)[0]
+            return random.choice(tuple(safe_moves))
         # Return None if no save moves are possible
         else:
             return None
@@ -301,14 +352,8 @@ class MinesweeperAI():
             2) are not known to be mines
         """
         
-        # Create a set with all possible options
-        all_moves = set()
-        for i in range(self.height):
-            for j in range(self.width):
-                all_moves.add((i,j))
-        
         # Create a set of all moves that have not been chosen and are not mines
-        possible_moves = all_moves - self.moves_made - self.mines
+        possible_moves = self._all_cells - self.moves_made - self.mines
         
         # Return None if no possible moves
         if not possible_moves:
@@ -316,7 +361,7 @@ class MinesweeperAI():
         
         
         # Pick a random move
-        best_move = random.sample(possible_moves, 1)[0]
+        best_move = random.choice(tuple(possible_moves))
         
         # Return random move if no knowledge base
         if not self.knowledge:          
@@ -327,16 +372,17 @@ class MinesweeperAI():
         n_moves = len(possible_moves)
         # Risk of an uncovered square is mines/(possible moves)
         risk = n_mines/n_moves
-        # Iterate over all possible moves and all sentences
-        for move in possible_moves:
-            for sentence in self.knowledge:
-                # Check risk of a move (count/number of cells) if move is in a sentence
-                if move in sentence.cells:
-                    newrisk = sentence.count / len(sentence.cells)
-                    # Update risk and best_move if it's smaller than the previous risk
-                    if newrisk < risk:
-                        risk = newrisk
-                        best_move = move
+        risk_by_cell = dict.fromkeys(possible_moves, risk)
+        # Go over every sentence once, and lower the risk of its cells (count/number of cells)
+        for sentence in self.knowledge:
+            newrisk = sentence.count / len(sentence.cells)
+            for cell in sentence.cells:
+                if cell in risk_by_cell and newrisk < risk_by_cell[cell]:
+                    risk_by_cell[cell] = newrisk
+        # Update best_move if a move is less risky than an uncovered square
+        least_risky = min(risk_by_cell, key=risk_by_cell.get)
+        if risk_by_cell[least_risky] < risk:
+            best_move = least_risky
         # Return least risky move
         return best_move
         
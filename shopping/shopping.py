@@ -1,4 +1,5 @@
-import csv
+import numpy as np
+import pandas as pd
 import sys
 
 from sklearn.model_selection import train_test_split
@@ -33,11 +34,11 @@ def main():
 
 def load_data(filename):
     """
-    Load shopping data from a CSV file `filename` and convert into a list of
-    evidence lists and a list of labels. Return a tuple (evidence, labels).
+    Load shopping data from a CSV file `filename` and convert into an array
+    of evidence rows and an array of labels. Return a tuple (evidence, labels).
 
-    evidence should be a list of lists, where each list contains the
-    following values, in order:
+    evidence should be a float32 array with a row per visit, where each row
+    contains the following values, in order:
         - Administrative, an integer
         - Administrative_Duration, a floating point number
         - Informational, an integer
@@ -56,62 +57,28 @@ def load_data(filename):
         - VisitorType, an integer 0 (not returning) or 1 (returning)
         - Weekend, an integer 0 (if false) or 1 (if true)
 
-    labels should be the corresponding list of labels, where each label
+    labels should be the corresponding array of labels, where each label
     is 1 if Revenue is true, and 0 otherwise.
     """
-    # List to store evidence and labels
-    evidence = []
-    labels = []
-    # Dictionary to convert non-numerical values to numerical values
-    convert = {
-            "Jan": 0,
-            "Feb": 1,
-            "Mar": 2,
-            "Apr": 3,
-            "May": 4,
-            "June": 5,
-            "Jul": 6,
-            "Aug": 7,
-            "Sep": 8,
-            "Oct": 9,
-            "Nov": 10,
-            "Dec": 11,
-            "Returning_Visitor": 1,
-            "New_Visitor": 0,
-            "Other": 0,
-            "TRUE": 1,
-            "FALSE": 0,
-            }
-    
-    # Open and read file
-    with open(filename, newline='') as file:
-        reader = csv.reader(file)
-        # Skip header row
-        next(reader)
-        
-        # Iterate through every row
-        for row in reader:
-            counter = 0
-            # List to store evidence from current row in
-            erow = []
-            # Iterate through every value in row
-            for value in row:
-                # Count on which value of row is operated on
-                counter = counter + 1
-                # 18th value of row is label, so append values to evidence and labels list
-                if counter == 18:
-                    evidence.append(erow)
-                    labels.append(convert.get(value))
-                # Convert non-numerical values to numerical values using convertion dictionary before adding to evidence list
-                elif counter == 11 or counter == 16 or counter == 17:
-                    erow.append(convert.get(value))
-                # Append float value to list of evidence from current row
-                elif counter == 2 or counter == 4 or 6 <= counter <= 10:
-                    erow.append(float(value))
-                # Append int value to list of evidence from current row
-                else:
-                    erow.append(int(value))
-    
+    # Months in order, so that their category codes are indices from 0 to 11
+    months = pd.CategoricalDtype([
+            "Jan", "Feb", "Mar", "Apr", "May", "June",
+            "Jul", "Aug", "Sep", "Oct", "Nov", "Dec",
+            ])
+
+    # Read the whole file at once, TRUE and FALSE are parsed as booleans and
+    # months are parsed straight into categories
+    data = pd.read_csv(filename, dtype={"Month": months})
+
+    # Convert the remaining non-numerical columns to numerical values
+    data["Month"] = data["Month"].cat.codes
+    data["VisitorType"] = data["VisitorType"] == "Returning_Visitor"
+
+    # Split off the label column and convert the rest to a single evidence
+    # array, booleans become 0 or 1 in the same cast
+    labels = data.pop("Revenue").to_numpy(dtype=int)
+    evidence = data.to_numpy(dtype=np.float32)
+
     # Return a tuple of evidence and labels
     return evidence, labels
 
@@ -142,34 +109,18 @@ def evaluate(labels, predictions):
     representing the "true negative rate": the proportion of
     actual negative labels that were accurately identified.
     """
-    # Initialise count of positive and negative labels
-    pos = 0
-    neg = 0
-    # Initialise sensitivity and specificitiy
-    sensitivity = 0
-    specificity = 0
-    
-    # Loop over every label and prediction
-    for label, prediction in zip(labels, predictions):
-        # Add 1 to positive label count if label positive
-        if label == 1:
-            pos += 1
-            # Add 1 to sensitivity count if prediction is also positive
-            if prediction == 1:
-                sensitivity += 1
-        # Add 1 to negative label count if label is negative
-        else:
-            neg += 1
-            # Add 1 to specificity count if predictino is also negative
-            if prediction == 0:
-                specificity += 1
-    
-    # Divide sensitivity and specificity by number of positive and negative labels respectfully
-    sensitivity = sensitivity / pos
-    specificity = specificity / neg
-    
+    # Masks of the positive and negative labels
+    labels = np.asarray(labels)
+    predictions = np.asarray(predictions)
+    positive = labels == 1
+    negative = ~positive
+
+    # Proportion of positive and negative labels that were also predicted as such
+    sensitivity = (positive & (predictions == 1)).sum() / positive.sum()
+    specificity = (negative & (predictions == 0)).sum() / negative.sum()
+
     # Return sensitivity and specificity
-    return (sensitivity, specificity)
+    return (float(sensitivity), float(specificity))
 
 if __name__ == "__main__":
     main()
@@ -2,13 +2,25 @@
 Tic Tac Toe Player
 """
 
+import functools
 import math
-import copy
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# Order in which minimax tries moves: center first, then corners, then edges
+MOVE_ORDER = [(1, 1), (0, 0), (0, 2), (2, 0), (2, 2), (0, 1), (1, 0), (1, 2), (2, 1)]
+
+# Minimax searches on bitmasks of the cells taken by X and by O, where cell
+# (i, j) is bit 3 * i + j; these are the bits of all (8) possible win options
+WIN_MASKS = [
+    0b000000111, 0b000111000, 0b111000000,  # rows
+    0b001001001, 0b010010010, 0b100100100,  # columns
+    0b100010001, 0b001010100                # diagonals
+]
+FULL = 0b111111111
+
 
 def initial_state():
     """
@@ -48,13 +60,15 @@ def actions(board):
     """
     Returns set of all possible actions (i, j) available on the board.
     """
-    # Make a set and store every coordinate that has "None" as value
+    # Take the free cells off the bitmask one lowest bit at a time
+    x, o = masks(board)
+    free = ~(x | o) & FULL
     actionlist = set()
-    for i in range(3):
-        for j in range(3):
-            if board[i][j] == None:
-                actionlist.add((i,j))
-    
+    while free:
+        bit = free & -free
+        actionlist.add(divmod(bit.bit_length() - 1, 3))
+        free ^= bit
+
     # Return the set with all possible actions
     return actionlist
 
@@ -69,8 +83,8 @@ def result(board, action):
     if board[i][j] != None:
         raise ValueError("Illegal Move")
     
-    # Make a copy of the board and implement move
-    boardcopy = copy.deepcopy(board)
+    # Make a copy of the board (the rows only hold strings) and implement move
+    boardcopy = [list(row) for row in board]
     boardcopy[i][j] = player(board)
     
     # Return the new board state
@@ -82,50 +96,57 @@ def winner(board):
     """
     Returns the winner of the game, if there is one.
     """
-    # Define all (8) possible win options and return winner 
-    if board[0][0] == board [1][1] == board [2][2]:
-        return board[0][0]
-    elif board[0][2] == board [1][1] == board [2][0]:
-        return board[0][2]
-    elif board[0][0] == board [0][1] == board [0][2] != None:
-        return board[0][0]
-    elif board[1][0] == board [1][1] == board [1][2] != None:
-        return board[1][0]
-    elif board[2][0] == board [2][1] == board [2][2] != None:
-        return board[2][0]
-    elif board[0][0] == board [1][0] == board [2][0] != None:
-        return board[0][0]
-    elif board[0][1] == board [1][1] == board [2][1] != None:
-        return board[0][1]
-    elif board[0][2] == board [1][2] == board [2][2] != None:
-        return board[0][2]    
-    else:
-        return None
+    _, value = evaluate(*masks(board))
+    if value == 1:
+        return X
+    elif value == -1:
+        return O
+    return None
+
+
+def masks(board):
+    """
+    Returns the board as a pair of bitmasks (x, o) of the cells taken by X
+    and by O.
+    """
+    x = o = 0
+    for i in range(3):
+        for j in range(3):
+            if board[i][j] == X:
+                x |= 1 << (3 * i + j)
+            elif board[i][j] == O:
+                o |= 1 << (3 * i + j)
+    return x, o
+
+
+def evaluate(x, o):
+    """
+    Returns (terminal, value) for bitmasks (x, o): whether the game is over,
+    and 1 if X has won, -1 if O has won, 0 otherwise.
+    """
+    # Check all (8) possible win options
+    for mask in WIN_MASKS:
+        if x & mask == mask:
+            return True, 1
+        if o & mask == mask:
+            return True, -1
+
+    # Game is also over when the board is full
+    return x | o == FULL, 0
 
 
 def terminal(board):
     """
     Returns True if game is over, False otherwise.
     """
-    # Game is over when there is a winner, or when the board is full (aka no possible moves left)
-    if winner(board) != None or len(actions(board)) == 0:
-        return True
-    else:
-        return False
+    return evaluate(*masks(board))[0]
 
 
 def utility(board):
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
-    # Use the winner function to determine winner
-    if winner(board) == "X":
-        return 1
-    elif winner(board) == "O":
-        return -1
-    # If there is no winner, the game is tied
-    else:
-        return 0
+    return evaluate(*masks(board))[1]
 
 def minimax(board):
     """
@@ -134,61 +155,87 @@ def minimax(board):
     # Don't return anything if game has ended
     if terminal(board):
         return None
-    
+
+    # Search on the bitmasks of the board, so positions can be cached
+    x, o = masks(board)
+
     # Return action that maximizes utility for player X
     if player(board) == "X":
-        return maxi(board)[1]
+        return maxi(x, o)[1]
     # Return action that minimizes utility for player O
     else:
-        return mini(board)[1]
+        return mini(x, o)[1]
 
 
-def mini(board):
+@functools.lru_cache(maxsize=None)
+def mini(x, o, alpha=-2, beta=2):
     """
-    Returns the minimum utility score with associated action.
+    Returns the minimum utility score with associated action, with O to move.
+    `x` and `o` are the bitmasks of the board; results are cached per state.
+    Subtrees that cannot lead to a score between `alpha` and `beta` are
+    pruned.
     """
     # If game has ended, return utility without action
-    if terminal(board):
-        return utility(board), None
-    
+    over, score = evaluate(x, o)
+    if over:
+        return score, None
+
     # Initial value for v
     v = 2
-    
-    # Loop over every action to find minimum utility
-    for action in actions(board):
-        v1, move1 = maxi(result(board, action))
+
+    # Loop over every free cell to find minimum utility
+    for action in MOVE_ORDER:
+        bit = 1 << (3 * action[0] + action[1])
+        if (x | o) & bit:
+            continue
+        v1, move1 = maxi(x, o | bit, alpha, beta)
         if v1 < v:
             v = v1
             move = action
             # If a winning action is found, directly return
             if v == -1:
                 return v, move
-    
+        # Stop if the maximizing player already has a better option elsewhere
+        beta = min(beta, v)
+        if alpha >= beta:
+            break
+
     # Return minimum utility and action
     return v, move
 
 
-def maxi(board):
+@functools.lru_cache(maxsize=None)
+def maxi(x, o, alpha=-2, beta=2):
     """
-    Returns the maximum utility score with associated action.
+    Returns the maximum utility score with associated action, with X to move.
+    `x` and `o` are the bitmasks of the board; results are cached per state.
+    Subtrees that cannot lead to a score between `alpha` and `beta` are
+    pruned.
     """
     # If game has ended, return utility without action
-    if terminal(board):
-        return utility(board), None
-    
+    over, score = evaluate(x, o)
+    if over:
+        return score, None
+
     # Initial value for v
     v = -2
-    
-    # Loop over every action to find maximum utility
-    for action in actions(board):
-        v1, move1 = mini(result(board, action))
+
+    # Loop over every free cell to find maximum utility
+    for action in MOVE_ORDER:
+        bit = 1 << (3 * action[0] + action[1])
+        if (x | o) & bit:
+            continue
+        v1, move1 = mini(x | bit, o, alpha, beta)
         if v1 > v:
             v = v1
             move = action
             # If a winning action is found, directly return
             if v == 1:
                 return v, move
+        # Stop if the minimizing player already has a better option elsewhere
+        alpha = max(alpha, v)
+        if alpha >= beta:
+            break
 
     # Return maximum utility and action
     return v, move
-    